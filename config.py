@@ -1,19 +1,60 @@
 import os
+import logging
+import pickle
 import yaml
+try:
+    from yaml import CSafeLoader as _YamlLoader # libyaml C extension, much faster
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 from dotenv import load_dotenv
 
+# Logging handlers are configured in utils.helpers (which imports this module), so use a
+# named logger here; records emitted before setup still reach stderr for warnings/errors.
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Load application settings from config.yaml
 CONFIG_YAML_PATH = "config.yaml"
+# Parsed settings are cached next to the YAML file and reused while the YAML is unchanged
+CONFIG_CACHE_PATH = CONFIG_YAML_PATH + ".pkl"
 settings = {}
 
+def _yaml_signature():
+    """(mtime_ns, size) of config.yaml; the cache is only used for the exact file it was parsed from."""
+    st = os.stat(CONFIG_YAML_PATH)
+    return (st.st_mtime_ns, st.st_size)
+
+def _load_cached_settings(signature):
+    """Returns the pickled settings if they were parsed from a config.yaml with this signature, else None."""
+    try:
+        with open(CONFIG_CACHE_PATH, 'rb') as f:
+            cached_signature, data = pickle.load(f)
+        return data if cached_signature == signature else None
+    except Exception: # Missing, truncated or incompatible cache; fall back to parsing the YAML
+        return None
+
+def _save_cached_settings(signature, data):
+    """Writes the parsed settings to the cache file (tmp file + rename so readers never see a partial file)."""
+    tmp_path = CONFIG_CACHE_PATH + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((signature, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CONFIG_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write config cache {CONFIG_CACHE_PATH}: {e}")
+
 try:
-    with open(CONFIG_YAML_PATH, 'r') as f:
-        settings = yaml.safe_load(f)
+    yaml_signature = _yaml_signature()
+    settings = _load_cached_settings(yaml_signature)
+    if settings is None:
+        with open(CONFIG_YAML_PATH, 'r') as f:
+            settings = yaml.load(f, Loader=_YamlLoader)
+        if settings:
+            _save_cached_settings(yaml_signature, settings)
 except FileNotFoundError:
-    print(f"Error: {CONFIG_YAML_PATH} not found.")
+    logger.error(f"{CONFIG_YAML_PATH} not found.")
     # Provide default settings or raise an error
     settings = { # Example default structure with 4 rules (removed min_avg_volume)
         'screener': {
@@ -36,34 +77,41 @@ except FileNotFoundError:
             'max_price': 1500.0,
             'enable_max_price_limit': True
         },
-        'paths': {'stock_list_file': 'stock_list.csv', 'valid_stock_list_file': 'valid_stock_list.csv', 'output_dir': 'outputs', 'report_dir': 'outputs/reports', 'token_store_file': 'token_store.json'},
+        'paths': {'stock_list_file': 'stock_list.csv', 'valid_stock_list_file': 'valid_stock_list.csv', 'output_dir': 'outputs', 'report_dir': 'outputs/reports', 'token_store_file': 'token_store.json', 'candle_cache_dir': 'outputs/candle_cache'},
         'reporting': {'max_reports': 2},
-        'upstox': {'api_version': 'v2'}
+        'upstox': {'api_version': 'v2', 'fetch_workers': 2, 'max_requests_per_second': 25},
+        'data_cache': {'enabled': True, 'ttl_minutes': 60, 'full_refresh_days': 7, 'max_stale_days': 2}
     }
-    print("Warning: Using default settings.")
+    logger.warning("Using default settings.")
 except yaml.YAMLError as e:
-    print(f"Error parsing {CONFIG_YAML_PATH}: {e}")
+    logger.error(f"Error parsing {CONFIG_YAML_PATH}: {e}")
     # Handle error appropriately
     raise SystemExit(f"Could not parse {CONFIG_YAML_PATH}")
 
 # --- Accessor functions or direct access ---
 
-# Secrets (from .env)
+# Secrets (from .env) - read once at import, .env values don't change during a run
+_UPSTOX_API_KEY = os.getenv("UPSTOX_API_KEY")
+_UPSTOX_API_SECRET = os.getenv("UPSTOX_API_SECRET")
+_UPSTOX_REDIRECT_URI = os.getenv("UPSTOX_REDIRECT_URI")
+_DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
+_DISCORD_STOCKLIST_WEBHOOK_URL = os.getenv("DISCORD_STOCKLIST_WEBHOOK_URL")
+
 def get_upstox_api_key():
-    return os.getenv("UPSTOX_API_KEY")
+    return _UPSTOX_API_KEY
 
 def get_upstox_api_secret():
-    return os.getenv("UPSTOX_API_SECRET")
+    return _UPSTOX_API_SECRET
 
 def get_upstox_redirect_uri():
-    return os.getenv("UPSTOX_REDIRECT_URI")
+    return _UPSTOX_REDIRECT_URI
 
 def get_discord_webhook_url():
-    return os.getenv("DISCORD_WEBHOOK_URL")
+    return _DISCORD_WEBHOOK_URL
 
 def get_discord_stocklist_webhook_url():
     """Gets the Discord webhook URL specifically for stock list validation reports."""
-    return os.getenv("DISCORD_STOCKLIST_WEBHOOK_URL")
+    return _DISCORD_STOCKLIST_WEBHOOK_URL
 
 # Settings (from config.yaml) - accessed via the 'settings' dictionary
 # Example: config.settings['screener']['price_min']
@@ -77,15 +125,15 @@ def get_discord_stocklist_webhook_url():
 # Update validation to check the main webhook, the stocklist one is optional for this script
 if not all([get_upstox_api_key(), get_upstox_api_secret(), get_upstox_redirect_uri()]):
      # Removed get_discord_webhook_url() check here as it's not essential for all parts
-     print("Warning: One or more environment variables (API Keys, Redirect URI) are missing in the .env file.")
+     logger.warning("One or more environment variables (API Keys, Redirect URI) are missing in the .env file.")
      # Depending on the script's needs, you might want to exit here
      # raise SystemExit("Missing essential configuration in .env file.")
 
 # Add specific check for the main webhook if needed elsewhere
 # if not get_discord_webhook_url():
-#    print("Warning: DISCORD_WEBHOOK_URL is missing in the .env file.")
+#    logger.warning("DISCORD_WEBHOOK_URL is missing in the .env file.")
 
 if not settings:
     raise SystemExit("Failed to load settings from config.yaml")
 
-print("Configuration loaded.")
+logger.debug("Configuration loaded.")
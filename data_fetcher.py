@@ -1,10 +1,26 @@
-import time  # NEW: ensure time is imported for time.sleep usage
+import time
 import config # Now imports the module that loads .env and yaml
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
-import pandas as pd # Import pandas
+import hashlib
+import threading
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+# orjson is optional; it decodes the candle payloads several times faster than stdlib json.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so the except clauses below cover both.
+# Both helpers work on bytes so files can be read/written in binary mode without a text layer.
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
 
 # Get logger from utils (assuming utils is imported elsewhere or configured globally)
 # If running standalone, configure basic logging here
@@ -19,29 +35,86 @@ except ImportError:
 # Get constants from loaded config
 TOKEN_FILE = config.settings['paths']['token_store_file']
 API_VERSION = config.settings['upstox']['api_version']
+# Default history window when from_date isn't given (lookback + buffer for calculations)
+DEFAULT_LOOKBACK_DAYS = config.settings['screener']['lookback_period'] + 40
+
+# Login endpoints and the constant parts of the token exchange request
+TOKEN_URL = f"https://api.upstox.com/{API_VERSION}/login/authorization/token"
+TOKEN_REQUEST_HEADERS = {
+    'accept': 'application/json',
+    'Content-Type': 'application/x-www-form-urlencoded'
+}
+TOKEN_REQUEST_DATA = {
+    'client_id': config.get_upstox_api_key(),
+    'client_secret': config.get_upstox_api_secret(),
+    'redirect_uri': config.get_upstox_redirect_uri(),
+    'grant_type': 'authorization_code'
+}
+AUTH_URL_TEMPLATE = (f"https://api.upstox.com/{API_VERSION}/login/authorization/dialog?"
+                     "response_type=code&client_id={api_key}&redirect_uri={redirect_uri}")
+
+# Historical candle endpoint; path order is {instrument_key}/{interval}/{to_date}/{from_date}
+HISTORICAL_URL_TEMPLATE = (f"https://api.upstox.com/{API_VERSION}/historical-candle/"
+                           "{instrument_key}/{interval}/{to_date}/{from_date}")
+
+# dtypes for the numeric candle columns returned by the historical-candle API
+NUMERIC_DTYPES = {
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'int64',
+    'open_interest': 'int64'
+}
+
+# On-disk cache of fetched candles, so repeated runs on the same day skip the API
+_cache_settings = config.settings.get('data_cache', {})
+CANDLE_CACHE_ENABLED = _cache_settings.get('enabled', True)
+CANDLE_CACHE_TTL_SECONDS = _cache_settings.get('ttl_minutes', 60) * 60
+# Incremental fetches only re-download the newest days, so the whole window is re-fetched this often
+CANDLE_CACHE_FULL_REFRESH_SECONDS = _cache_settings.get('full_refresh_days', 7) * 86400
+# Fallback after a failed fetch: cached candles more trading days behind to_date than this aren't served
+CANDLE_CACHE_MAX_STALE_DAYS = _cache_settings.get('max_stale_days', 2)
+CANDLE_CACHE_DIR = config.settings['paths'].get(
+    'candle_cache_dir', os.path.join(config.settings['paths']['output_dir'], 'candle_cache'))
+
+# Upper bound on concurrent Upstox requests; also the size of the keep-alive connection pool
+MAX_CONCURRENT_REQUESTS = 8
+
+# Request-rate cap across all threads (0 disables it). Calls are spaced at least 1/rate apart,
+# so a thread only sleeps when requests are actually arriving faster than the cap.
+MAX_REQUESTS_PER_SECOND = config.settings.get('upstox', {}).get('max_requests_per_second', 25)
+_MIN_REQUEST_INTERVAL = 1.0 / MAX_REQUESTS_PER_SECOND if MAX_REQUESTS_PER_SECOND else 0.0
+_rate_lock = threading.Lock()
+_next_request_at = 0.0
+
+# Shared HTTP session so the TCP+TLS connection to Upstox is reused across calls.
+# pool_block makes extra threads wait for a pooled connection instead of opening (and
+# discarding) new ones, so a batch never pays more than MAX_CONCURRENT_REQUESTS handshakes.
+# urllib3 retries 429/5xx responses with exponential backoff (and honours Retry-After).
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=1, # All requests go to a single host
+    pool_maxsize=MAX_CONCURRENT_REQUESTS,
+    pool_block=True,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+))
 
 def exchange_code_for_token(auth_code):
     """Exchanges the authorization code for an access token."""
-    url = f"https://api.upstox.com/{API_VERSION}/login/authorization/token"
-    headers = {
-        'accept': 'application/json',
-        'Content-Type': 'application/x-www-form-urlencoded'
-    }
-    data = {
-        'code': auth_code,
-        'client_id': config.get_upstox_api_key(), # Use accessor function
-        'client_secret': config.get_upstox_api_secret(), # Use accessor function
-        'redirect_uri': config.get_upstox_redirect_uri(), # Use accessor function
-        'grant_type': 'authorization_code'
-    }
+    global _access_token, _api_headers
+    data = dict(TOKEN_REQUEST_DATA, code=auth_code)
     try:
-        response = requests.post(url, headers=headers, data=data)
+        response = _session.post(TOKEN_URL, headers=TOKEN_REQUEST_HEADERS, data=data)
         response.raise_for_status()  # Raise an exception for bad status codes
-        token_data = response.json()
+        token_data = _json_loads(response.content)
         # Add expiry time for checking later (assuming token lasts less than a day for safety)
         # Consider making the token duration configurable or getting it from response if available
-        token_data['expires_at'] = (datetime.now() + timedelta(hours=12)).isoformat()
+        token_data['expires_at'] = time.time() + 12 * 3600
         save_token(token_data)
+        # Drop cached token/headers so subsequent calls pick up the new token
+        _access_token = token_data.get('access_token')
+        _api_headers = None
         print("Access token obtained and saved successfully.")
         return token_data.get('access_token')
     except requests.exceptions.RequestException as e:
@@ -60,35 +133,37 @@ def exchange_code_for_token(auth_code):
 def save_token(token_data):
     """Saves token data to a file."""
     try:
-        with open(TOKEN_FILE, 'w') as f:
-            json.dump(token_data, f)
-            print(f"Token data saved to {TOKEN_FILE}")
+        with open(TOKEN_FILE, 'wb') as f:
+            f.write(_json_dumps(token_data))
+        logging.debug(f"Token data saved to {TOKEN_FILE}")
     except IOError as e:
-        print(f"Error saving token file {TOKEN_FILE}: {e}")
+        logging.error(f"Error saving token file {TOKEN_FILE}: {e}")
 
 def load_token():
     """Loads token data from a file and checks expiry."""
-    if not os.path.exists(TOKEN_FILE):
-        return None
     try:
-        with open(TOKEN_FILE, 'r') as f:
-            token_data = json.load(f)
-            # Check expiry
-            expires_at_str = token_data.get('expires_at')
-            if expires_at_str:
-                expires_at = datetime.fromisoformat(expires_at_str)
-                if datetime.now() >= expires_at:
-                    print("Access token has expired.")
+        with open(TOKEN_FILE, 'rb') as f:
+            token_data = _json_loads(f.read())
+            # Check expiry (stored as a Unix epoch; older token files used an ISO string)
+            expires_at = token_data.get('expires_at')
+            if expires_at:
+                if isinstance(expires_at, str):
+                    expires_at = datetime.fromisoformat(expires_at).timestamp()
+                if time.time() >= expires_at:
+                    logging.warning("Access token has expired.")
                     # Optionally, attempt refresh here if refresh token exists and is supported
                     # For now, just indicate expiry
                     return None
             return token_data
+    except FileNotFoundError:
+        return None
     except (IOError, json.JSONDecodeError, ValueError) as e:
-        print(f"Error loading or parsing token file: {e}")
+        logging.error(f"Error loading or parsing token file: {e}")
         return None
 
-# Store the loaded access token globally within this module
+# Store the loaded access token (and the auth headers built from it) globally within this module
 _access_token = None
+_api_headers = None
 
 def get_access_token():
     """Gets the current access token, loading if necessary."""
@@ -118,9 +193,7 @@ def get_access_token():
              return None
 
         print("\n2. Open this Authorization URL in your web browser:")
-        auth_url = (f"https://api.upstox.com/{API_VERSION}/login/authorization/dialog?"
-                    f"response_type=code&client_id={api_key}"
-                    f"&redirect_uri={redirect_uri}")
+        auth_url = AUTH_URL_TEMPLATE.format(api_key=api_key, redirect_uri=redirect_uri)
         print(f"\n   {auth_url}\n")
         print(f"3. Log in to Upstox and authorize the application.")
         print(f"4. After authorization, your browser will redirect to:")
@@ -136,14 +209,18 @@ def get_access_token():
 
 
 def get_api_headers():
-    """Returns the headers required for authenticated API calls."""
+    """Returns the headers required for authenticated API calls (built once per token)."""
+    global _api_headers
+    if _api_headers:
+        return _api_headers
     token = get_access_token()
     if not token:
         return None
-    return {
+    _api_headers = {
         'accept': 'application/json',
         'Authorization': f'Bearer {token}'
     }
+    return _api_headers
 
 # --- Placeholder for the actual API client/session ---
 # We don't need a full client object now, just the headers.
@@ -163,86 +240,287 @@ def fetch_historical_data(instrument_key, interval='day', to_date=None, from_dat
     Returns:
         pandas.DataFrame: DataFrame with columns ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'open_interest']
                           Returns None if fetching fails or no data is returned.
+                          Candles are cached on disk per instrument; within CANDLE_CACHE_TTL_SECONDS the
+                          cache is used as-is if it covers to_date, otherwise only the days since the last
+                          cached candle are re-fetched. The whole window is re-downloaded every
+                          CANDLE_CACHE_FULL_REFRESH_SECONDS. If the API call fails, the stale cached copy
+                          is returned when its last candle is at most CANDLE_CACHE_MAX_STALE_DAYS trading
+                          days behind to_date.
     """
-    headers = get_api_headers()
-    if not headers:
-        logging.error("Cannot fetch data, authentication failed or token missing.")
+    if not to_date or not from_date:
+        default_to_date, default_from_date = _default_date_range()
+        if not to_date:
+            to_date = default_to_date
+
+        if not from_date:
+            # Calculate a default from_date if not provided, e.g., 60 days back for daily interval
+            # Note: The API docs list from_date as a required path parameter, so this might cause issues if not provided.
+            # We need sufficient data for lookback calculations (e.g., 20 days + buffer).
+            from_date = default_from_date
+            logging.warning(f"from_date not provided, defaulting to {from_date}")
+
+    if not CANDLE_CACHE_ENABLED:
+        return _download_historical_data(instrument_key, interval, to_date, from_date)
+
+    # One cache file per instrument/interval. Candles before the last cached day never change,
+    # so a stale cache only needs the days since then re-fetched instead of the whole window.
+    cache_path = _candle_cache_path(instrument_key, interval)
+    cached = _read_candle_cache(cache_path)
+    stale_df = None # Served if the API call fails
+    if cached is not None:
+        covered_from, covered_to, full_fetch_at, cached_df, age = cached
+        if covered_from > from_date:
+            cached = None # Cache starts after the requested window; fetch everything
+        else:
+            stale_df = cached_df
+            if time.time() - full_fetch_at > CANDLE_CACHE_FULL_REFRESH_SECONDS:
+                cached = None # Older candles haven't been re-downloaded in a while; fetch everything
+    fetch_from = from_date
+    if cached is not None:
+        last_cached_date = _candle_dates(cached_df).iloc[-1]
+        # Candles before the last cached one are final; otherwise the cache must be fresh and
+        # have been fetched through at least to_date (a fetch ending earlier knows nothing after it)
+        if to_date < last_cached_date or (age <= CANDLE_CACHE_TTL_SECONDS and to_date <= covered_to):
+            logging.info(f"Using cached candles for {instrument_key} ({len(cached_df)} rows)")
+            return _slice_candles(cached_df, from_date, to_date)
+        # Re-fetch the last cached day too, since that candle may have been taken mid-session
+        fetch_from = max(last_cached_date, from_date)
+
+    df = _download_historical_data(instrument_key, interval, to_date, fetch_from)
+
+    if df is None:
+        if stale_df is not None:
+            import numpy as np
+            last_stale_date = _candle_dates(stale_df).iloc[-1]
+            days_behind = int(np.busday_count(last_stale_date, to_date)) # Weekdays; exchange holidays count too
+            if days_behind <= CANDLE_CACHE_MAX_STALE_DAYS:
+                logging.warning(f"Serving stale cached candles for {instrument_key} after fetch failure (last candle {last_stale_date}).")
+                return _slice_candles(stale_df, from_date, to_date)
+            logging.warning(f"Cached candles for {instrument_key} end {last_stale_date}, {days_behind} trading day(s) before {to_date}; not serving them after fetch failure.")
         return None
 
-    if not to_date:
-        to_date = datetime.now().strftime('%Y-%m-%d')
+    import pandas as pd
+    if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        # Timestamps didn't parse, so the candles can't be sliced, merged or cached by date.
+        # Hand back the whole window uncached, as with the cache disabled.
+        if fetch_from != from_date:
+            return _download_historical_data(instrument_key, interval, to_date, from_date)
+        return df
+
+    if cached is not None:
+        older = cached_df[_candle_dates(cached_df) < fetch_from]
+        df = pd.concat([older, df], ignore_index=True)
+        logging.info(f"Merged {len(older)} cached and {len(df) - len(older)} fetched candles for {instrument_key}")
+    else:
+        full_fetch_at = time.time()
+    df = _slice_candles(df, from_date, to_date)
+    _write_candle_cache(cache_path, (from_date, to_date, full_fetch_at), df)
+    return df
+
 
-    if not from_date:
-        # Calculate a default from_date if not provided, e.g., 60 days back for daily interval
-        # Note: The API docs list from_date as a required path parameter, so this might cause issues if not provided.
-        # We need sufficient data for lookback calculations (e.g., 20 days + buffer).
-        lookback_days = config.settings['screener']['lookback_period'] + 40 # Fetch buffer
-        from_date = (datetime.now() - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
-        logging.warning(f"from_date not provided, defaulting to {from_date}")
+# (expiry on the monotonic clock, to_date, from_date) for the default date range
+_default_dates = (0.0, None, None)
+DEFAULT_DATES_TTL_SECONDS = 60
 
+def _default_date_range():
+    """
+    Returns the default (to_date, from_date) strings. They are reformatted at most once
+    per DEFAULT_DATES_TTL_SECONDS, so a batch run doesn't strftime per instrument while a
+    long-lived process still rolls over to the new day.
+    """
+    global _default_dates
+    expires_at, to_date, from_date = _default_dates
+    now = time.monotonic()
+    if now >= expires_at:
+        today = datetime.now()
+        to_date = today.strftime('%Y-%m-%d')
+        from_date = (today - timedelta(days=DEFAULT_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        _default_dates = (now + DEFAULT_DATES_TTL_SECONDS, to_date, from_date)
+    return to_date, from_date
+
+def _candle_cache_path(instrument_key, interval):
+    """Returns the cache file path for one instrument's candles at one interval."""
+    key = hashlib.md5(f"{instrument_key}|{interval}".encode()).hexdigest()
+    return os.path.join(CANDLE_CACHE_DIR, f"{key}.pkl")
+
+def _candle_dates(df):
+    """'YYYY-MM-DD' string per candle, directly comparable with the API's date arguments."""
+    return df['timestamp'].dt.strftime('%Y-%m-%d')
+
+def _slice_candles(df, from_date, to_date):
+    """Rows of df whose candle date falls within [from_date, to_date]."""
+    dates = _candle_dates(df)
+    return df[(dates >= from_date) & (dates <= to_date)].reset_index(drop=True)
+
+def _read_candle_cache(path):
+    """
+    Loads (covered_from, covered_to, full_fetch_at, df, age_seconds) from the candle cache,
+    or None if missing or unreadable.
+    """
+    try:
+        age = time.time() - os.path.getmtime(path)
+        import pandas as pd
+        (covered_from, covered_to, full_fetch_at), df = pd.read_pickle(path)
+        if df.empty or not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            return None
+        return covered_from, covered_to, full_fetch_at, df, age
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Could not read candle cache {path}: {e}")
+        return None
+
+def _write_candle_cache(path, coverage, df):
+    """
+    Writes candles to the cache with their (covered_from, covered_to, full_fetch_at) coverage:
+    the requested date range and when the whole range was last downloaded. Uses a tmp file +
+    rename so readers never see a partial file. Frames whose timestamps failed to parse are skipped.
+    """
+    import pandas as pd
+    if df.empty or not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        return
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CANDLE_CACHE_DIR, exist_ok=True)
+        pd.to_pickle((coverage, df), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.warning(f"Could not write candle cache {path}: {e}")
+
+def _candles_to_dataframe(candles):
+    """
+    Builds the candle DataFrame column-wise: the numeric fields are converted in a single
+    pass into one contiguous float64 array and each column is a view into it, avoiding
+    row-wise object construction and per-column conversions.
+    Candle layout per documentation: [timestamp, open, high, low, close, volume, open_interest]
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns = ['timestamp'] + list(NUMERIC_DTYPES)
+    try:
+        values = np.asarray([candle[1:7] for candle in candles], dtype=np.float64) # None -> NaN
+        if values.ndim != 2 or values.shape[1] != len(NUMERIC_DTYPES):
+            raise ValueError(f"unexpected candle shape {values.shape}")
+    except (ValueError, TypeError):
+        # Ragged or non-numeric candles: fall back to per-column coercion
+        df = pd.DataFrame(candles, columns=columns)
+        for col in NUMERIC_DTYPES:
+            df[col] = pd.to_numeric(df[col], errors='coerce') # Coerce errors to NaN
+        return df
+
+    data = {'timestamp': [candle[0] for candle in candles]}
+    for i, (col, dtype) in enumerate(NUMERIC_DTYPES.items()):
+        column = values[:, i]
+        if dtype == 'int64' and not np.isnan(column).any():
+            column = column.astype(np.int64)
+        data[col] = column
+    return pd.DataFrame(data, columns=columns)
+
+def _wait_for_request_slot():
+    """Blocks until the next API call fits under MAX_REQUESTS_PER_SECOND; returns at once when under the cap."""
+    global _next_request_at
+    if not _MIN_REQUEST_INTERVAL:
+        return
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_at - now
+        _next_request_at = max(now, _next_request_at) + _MIN_REQUEST_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+def _download_historical_data(instrument_key, interval, to_date, from_date):
+    """Requests candles from the Upstox API and converts them into a DataFrame (None on failure)."""
+    # Imported lazily so token-only flows (exchange/load/save) don't pay the pandas import cost
+    import pandas as pd
+
+    headers = get_api_headers()
+    if not headers:
+        logging.error("Cannot fetch data, authentication failed or token missing.")
+        return None
 
     # Construct the URL using path parameters as per documentation
     # Example: https://api.upstox.com/v2/historical-candle/NSE_EQ|INE848E01016/day/2024-04-29/2024-03-01
     # Note the order: {instrument_key}/{interval}/{to_date}/{from_date} - This seems counter-intuitive (to before from)
     # Let's try the documented order first.
-    historical_data_url = f"https://api.upstox.com/{API_VERSION}/historical-candle/{instrument_key}/{interval}/{to_date}/{from_date}"
+    historical_data_url = HISTORICAL_URL_TEMPLATE.format(
+        instrument_key=instrument_key, interval=interval, to_date=to_date, from_date=from_date
+    )
 
     logging.info(f"Fetching historical data for {instrument_key} from {from_date} to {to_date}")
     logging.debug(f"API URL: {historical_data_url}")
 
-    max_retries = 3
-    for attempt in range(max_retries):
+    try:
+        _wait_for_request_slot()
+        response = _session.get(historical_data_url, headers=headers)
+        response.raise_for_status()  # Raises exception for 4xx/5xx codes
+        data = _json_loads(response.content)
+        if data.get('status') != 'success':
+            logging.error(f"API request failed for {instrument_key}. Status: {data.get('status')}, Message: {data.get('message', 'N/A')}")
+            return None
+        candles = data.get('data', {}).get('candles')
+        if not candles:
+            logging.warning(f"No candle data returned for {instrument_key} for the given period.")
+            return None
+        df = _candles_to_dataframe(candles)
+
+        # Convert timestamp to datetime objects (adjust format if needed, API uses ISO 8601)
+        # Example: "2023-10-01T00:00:00+05:30"
         try:
-            response = requests.get(historical_data_url, headers=headers)
-            response.raise_for_status()  # Raises exception for 4xx/5xx codes
-            data = response.json()
-            if data.get('status') != 'success':
-                logging.error(f"API request failed for {instrument_key}. Status: {data.get('status')}, Message: {data.get('message', 'N/A')}")
-                return None
-            candles = data.get('data', {}).get('candles')
-            if not candles:
-                logging.warning(f"No candle data returned for {instrument_key} for the given period.")
-                return None
-            # Define column names based on documentation order
-            columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'open_interest']
-            df = pd.DataFrame(candles, columns=columns)
-
-            # Convert timestamp to datetime objects (adjust format if needed, API uses ISO 8601)
-            # Example: "2023-10-01T00:00:00+05:30"
-            try:
-                # Let pandas infer the format, which usually works well with ISO 8601
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                # Optional: Convert to date if only date part is needed for daily data
-                # df['date'] = df['timestamp'].dt.date
-            except Exception as e:
-                logging.warning(f"Could not parse timestamp column for {instrument_key}: {e}. Leaving as string.")
+            # Let pandas infer the format, which usually works well with ISO 8601
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            # Optional: Convert to date if only date part is needed for daily data
+            # df['date'] = df['timestamp'].dt.date
+        except Exception as e:
+            logging.warning(f"Could not parse timestamp column for {instrument_key}: {e}. Leaving as string.")
 
 
-            # Convert numeric columns
-            numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'open_interest']
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce') # Coerce errors to NaN
+        # Ensure ascending timestamp order. Upstox returns candles newest-first, so a reverse
+        # slice is usually enough; only fall back to a full sort for unordered data.
+        timestamps = df['timestamp']
+        if not timestamps.is_monotonic_increasing:
+            if timestamps.is_monotonic_decreasing:
+                df = df.iloc[::-1].reset_index(drop=True)
+            else:
+                df = df.sort_values(by='timestamp').reset_index(drop=True)
 
-            # Sort by timestamp just in case API doesn't guarantee order
-            df = df.sort_values(by='timestamp').reset_index(drop=True)
+        logging.info(f"Successfully fetched and processed {len(df)} candles for {instrument_key}")
+        return df
 
-            logging.info(f"Successfully fetched and processed {len(df)} candles for {instrument_key}")
-            return df
+    except requests.exceptions.RetryError as retry_err:
+        # Raised once the session adapter has exhausted its 429/5xx retries
+        logging.error(f"Max retries exceeded for {instrument_key}: {retry_err}")
+        return None
+    except requests.exceptions.HTTPError as http_err:
+        logging.error(f"HTTP error occurred for {instrument_key}: {http_err}")
+        return None
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during data fetching for {instrument_key}: {e}")
+        return None
 
-        except requests.exceptions.HTTPError as http_err:
-            if response.status_code == 429:
-                delay = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s, etc.
-                logging.error(f"HTTP error 429 for {instrument_key}. Attempt {attempt+1}/{max_retries}. Retrying after {delay} second(s).")
-                time.sleep(delay)
-                continue
-            else:
-                logging.error(f"HTTP error occurred for {instrument_key}: {http_err}")
-                return None
-        except Exception as e:
-            logging.error(f"An unexpected error occurred during data fetching for {instrument_key}: {e}")
-            return None
-    logging.error(f"Max retries exceeded for {instrument_key}.")
-    return None
+def fetch_historical_data_batch(instrument_keys, max_workers=MAX_CONCURRENT_REQUESTS, **kwargs):
+    """
+    Fetches historical candle data for many instruments concurrently.
+    The requests are network-bound, so a thread pool sharing the module session overlaps the round-trips.
+
+    Args:
+        instrument_keys (list): Upstox instrument keys to fetch.
+        max_workers (int): Maximum number of concurrent requests. Defaults to MAX_CONCURRENT_REQUESTS.
+        **kwargs: Passed through to fetch_historical_data (interval, to_date, from_date).
+
+    Returns:
+        dict: Mapping of instrument_key -> DataFrame (or None if fetching failed for that key).
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {key: executor.submit(fetch_historical_data, key, **kwargs) for key in instrument_keys}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                logging.error(f"Unexpected error fetching data for {key}: {e}")
+                results[key] = None
+    return results
 
 
 # Example usage (for testing later)
@@ -1,71 +1,211 @@
 import requests
+from urllib3.util.retry import Retry
 import json
 from datetime import datetime, timezone
 import time
-import pytz # Import pytz for IST conversion
-import os # Import os for basename
+import random
+from zoneinfo import ZoneInfo # Stdlib IST conversion (Python 3.9+)
 
 import config
 from utils.helpers import logging
 
+# orjson is optional; it encodes straight to UTF-8 bytes, which requests sends as-is
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+IST_TZ = ZoneInfo('Asia/Kolkata')
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+# (connect, read) timeout: fail fast on an unreachable host without cutting off slow responses
+_TIMEOUT = (3.05, 7.0)
+
+# Shared session so consecutive webhook posts reuse the keep-alive connection to discord.com.
+# Connection errors and 5xx responses are retried with exponential backoff. Retry-After is not honoured
+# here, so urllib3 never retries a 429 itself; post_discord_webhook handles those. raise_on_status=False
+# returns the last response so raise_for_status reports it.
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["POST"],
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+))
+
+DISCORD_USERNAME = "ZT-3 Screener"
+COLOR_ALERT = 0x2ECC71 # Green: stocks found
+COLOR_NO_RESULTS = 0xFFA500 # Orange: nothing passed
+
+# Static parts of the 'No Results' embed
+NO_RESULTS_EMBED = {"color": COLOR_NO_RESULTS}
+NO_RESULTS_TITLE_PREFIX = "📉 ZT-3 Daily Scan - "
+NO_RESULTS_DESCRIPTION_PREFIX = "No stocks met the screening criteria today.\n\nYou can view the reports here: "
+
+# Stock lines per alert embed (Discord caps an embed description at 4096 characters)
+MAX_LINES_PER_EMBED = 40
+MAX_CHARS_PER_EMBED = 4000
+
+# Discord limits per webhook message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000 # Combined title/description/footer text of all embeds
+
+def _embed_length(embed):
+    """Counts the characters of an embed that Discord includes in its per-message total."""
+    return len(embed.get("title", "")) + len(embed.get("description", "")) + len(embed.get("footer", {}).get("text", ""))
+
+def _group_embeds(embeds):
+    """Splits embeds into per-message groups that respect Discord's embed count and size limits."""
+    # Common case: everything fits in a single message
+    if len(embeds) <= MAX_EMBEDS_PER_MESSAGE and sum(map(_embed_length, embeds)) <= MAX_EMBED_CHARS_PER_MESSAGE:
+        return [embeds]
+    groups = []
+    current, current_chars = [], 0
+    for embed in embeds:
+        embed_chars = _embed_length(embed)
+        if current and (len(current) >= MAX_EMBEDS_PER_MESSAGE or current_chars + embed_chars > MAX_EMBED_CHARS_PER_MESSAGE):
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(embed)
+        current_chars += embed_chars
+    if current:
+        groups.append(current)
+    return groups
+
+def _chunk_line_ranges(lines, max_lines, max_chars, first_offset=0):
+    """
+    Splits lines into (start, end) slices of at most max_lines lines / max_chars characters each,
+    walking the lines once with running counters. first_offset is text the first part carries
+    besides its lines (e.g. a leading note). A single over-long line still gets a part of its own.
+    """
+    ranges = []
+    part_start, part_chars = 0, first_offset
+    for i, line in enumerate(lines):
+        if i > part_start and (i - part_start >= max_lines or part_chars + len(line) > max_chars):
+            ranges.append((part_start, i))
+            part_start, part_chars = i, 0
+        part_chars += len(line)
+    ranges.append((part_start, len(lines)))
+    return ranges
+
+def _retry_after_seconds(response):
+    """Reads how long Discord asked us to wait from a 429 response (header first, then JSON body)."""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        pass
+    try:
+        return float(response.json().get("retry_after", 1))
+    except (ValueError, AttributeError):
+        return 1.0
+
+# Monotonic time before which each webhook's rate-limit bucket is exhausted
+_rate_limit_reset_at = {}
+
+def _note_rate_limit(webhook_url, response):
+    """Remembers when the webhook's bucket refills if this response used up its last request."""
+    try:
+        if int(response.headers["X-RateLimit-Remaining"]) == 0:
+            _rate_limit_reset_at[webhook_url] = time.monotonic() + float(response.headers["X-RateLimit-Reset-After"])
+    except (KeyError, ValueError):
+        pass
+
+def post_discord_webhook(webhook_url, payload, timeout=_TIMEOUT, max_retries=3):
+    """
+    Posts a webhook payload as pre-encoded JSON bytes over the shared session.
+    Waits first only if an earlier response reported the webhook's bucket as empty.
+    Rate-limited (HTTP 429) responses are retried after the delay Discord returns,
+    up to max_retries times; other error statuses raise HTTPError.
+    """
+    body = _json_dumps(payload)
+    wait = _rate_limit_reset_at.pop(webhook_url, 0) - time.monotonic()
+    if wait > 0:
+        logging.info(f"Discord rate limit bucket empty. Waiting {wait:.2f} second(s) before the next message.")
+        time.sleep(wait)
+    for attempt in range(max_retries + 1):
+        response = _SESSION.post(webhook_url, data=body, headers=_JSON_HEADERS, timeout=timeout)
+        if response.status_code != 429 or attempt == max_retries:
+            break
+        delay = _retry_after_seconds(response)
+        logging.warning(f"Discord rate limit hit. Retrying after {delay:.2f} second(s) (attempt {attempt + 1}/{max_retries}).")
+        time.sleep(delay + random.uniform(0, 0.5))
+    _note_rate_limit(webhook_url, response)
+    response.raise_for_status()
+    return response
+
 def send_discord_notification(
     shortlisted_stocks,
-    duration_seconds=None
+    duration_seconds=None,
+    trading_date=None
 ):
     """
     Sends a notification to the main Discord webhook.
     Instead of sending file attachments, includes hyperlinks to the day-specific success and failure reports.
+    Pass trading_date when the caller already knows it (main.py uses it for the report filenames);
+    otherwise it is derived from the shortlisted stocks.
     """
     webhook_url = config.get_discord_webhook_url()
     if not webhook_url:
         logging.warning("Discord webhook URL not configured. Skipping notification.")
         return
 
+    # Read the clock once; local, UTC and IST views are derived from the same instant
+    now_utc = datetime.now(timezone.utc)
+    now_local = now_utc.astimezone()
+
     # Determine trading/report date based on shortlisted stocks or fallback to today.
-    if shortlisted_stocks:
+    if trading_date is None and shortlisted_stocks:
          dates = [s.get('timestamp') for s in shortlisted_stocks if s.get('timestamp')]
-         report_date = max(dates).strftime("%Y%m%d") if dates else datetime.now().strftime("%Y%m%d")
-         screening_date_str = max(dates).strftime('%d %B %Y') if dates else datetime.now(timezone.utc).strftime('%d %B %Y')
+         trading_date = max(dates) if dates else None
+    if trading_date is not None:
+         report_date = trading_date.strftime("%Y%m%d")
+         screening_date_str = trading_date.strftime('%d %B %Y')
     else:
-         report_date = datetime.now().strftime("%Y%m%d")
-         screening_date_str = datetime.now(timezone.utc).strftime('%d %B %Y')
+         report_date = now_local.strftime("%Y%m%d")
+         screening_date_str = now_utc.strftime('%d %B %Y')
 
     # Build day-specific report URLs
     success_report_url = f"https://jittojoseph.github.io/ZT3-Stock-Screener/success_report_{report_date}.html"
     failure_report_url = f"https://jittojoseph.github.io/ZT3-Stock-Screener/failure_report_{report_date}.html"
 
-    username = "ZT-3 Screener"
-    duration_str = f"{duration_seconds:.2f}s" if duration_seconds is not None and duration_seconds <= 60 else (
-                   f"{int(duration_seconds//60)}m {int(duration_seconds%60)}s" if duration_seconds is not None else "")
+    if duration_seconds is None:
+        duration_str = ""
+    elif duration_seconds <= 60:
+        duration_str = f"{duration_seconds:.2f}s"
+    else:
+        minutes, seconds = divmod(int(duration_seconds), 60)
+        duration_str = f"{minutes}m {seconds}s"
     try:
-        ist_tz = pytz.timezone('Asia/Kolkata')
-        now_ist = datetime.now(ist_tz)
-        now_formatted_str = now_ist.strftime('Today at %I:%M %p IST') if now_ist.date() == datetime.now(ist_tz).date() else now_ist.strftime('%d %b %Y, %I:%M %p IST')
+        now_formatted_str = now_utc.astimezone(IST_TZ).strftime('Today at %I:%M %p IST')
     except Exception as e:
         logging.error(f"Error formatting IST time: {e}")
-        now_formatted_str = datetime.now(timezone.utc).strftime('%d %b %Y, %H:%M UTC')
+        now_formatted_str = now_utc.strftime('%d %b %Y, %H:%M UTC')
 
     # Build common report links text with day-specific URLs
     report_links = (f"[Success Report]({success_report_url}) | "
                     f"[Failure Analysis Report]({failure_report_url})")
     
+    footer_text = f"Took {duration_str}\n{now_formatted_str}" if duration_str else now_formatted_str
+
     if not shortlisted_stocks:
         logging.info("No stocks passed screening. Sending 'No Results' notification.")
-        description = ("No stocks met the screening criteria today.\n\n"
-                       f"You can view the reports here: {report_links}")
-        footer_text = f"Took {duration_str}\n{now_formatted_str}" if duration_str else now_formatted_str
-        payload = {
-            "username": username,
-            "embeds": [{
-                "title": f"📉 ZT-3 Daily Scan - {screening_date_str}",
-                "description": description,
-                "color": 0xFFA500,
-                "footer": {"text": footer_text},
-            }]
-        }
+        embed = dict(
+            NO_RESULTS_EMBED,
+            title=NO_RESULTS_TITLE_PREFIX + screening_date_str,
+            description=NO_RESULTS_DESCRIPTION_PREFIX + report_links,
+            footer={"text": footer_text}
+        )
+        payload = {"username": DISCORD_USERNAME, "embeds": [embed]}
         try:
-            response = requests.post(webhook_url, json=payload, timeout=15)
-            response.raise_for_status()
+            post_discord_webhook(webhook_url, payload)
             logging.info("Discord 'No Results' notification sent.")
         except requests.exceptions.RequestException as e:
             logging.error(f"Error sending Discord 'No Results' notification: {e}")
@@ -78,65 +218,47 @@ def send_discord_notification(
     # For stocks found: create embeds with links added to the description.
     logging.info(f"Sending {len(shortlisted_stocks)} shortlisted stocks to Discord...")
     stock_count = len(shortlisted_stocks)
-    embeds_to_send = []
-    max_lines = 40
-    max_chars = 4000
-    current_desc = ""
-    part_num = 1
-    total_parts = (len(shortlisted_stocks) + max_lines - 1) // max_lines
-    footer_text_main = f"Took {duration_str}\n{now_formatted_str}" if duration_str else now_formatted_str
 
     # Prepend the report links note in the first embed
     note = f"You can view the reports here: {report_links}\n\n"
-    first_embed = True
-
-    for i, stock in enumerate(shortlisted_stocks):
-        line = f"**{stock.get('symbol', 'N/A')}** - ₹{stock.get('close', 0.00):.2f}\n"
-        if len(current_desc) + len(line) > max_chars or current_desc.count('\n') >= max_lines:
-            if first_embed:
-                current_desc = note + current_desc
-                first_embed = False
-            embed_title = f"🚀 ZT-3 Breakout Alert ({stock_count} Stocks) - {screening_date_str}" + (f" (Part {part_num}/{total_parts})" if total_parts > 1 else "")
-            embeds_to_send.append({
-                "title": embed_title,
-                "description": current_desc,
-                "color": 0x2ECC71,
-                "footer": {"text": footer_text_main} if part_num == 1 else {}
-            })
-            current_desc = line
-            part_num += 1
-        else:
-            current_desc += line
-
-    if current_desc:
-        if first_embed:
-            current_desc = note + current_desc
-        embed_title = f"🚀 ZT-3 Breakout Alert ({stock_count} Stocks) - {screening_date_str}" + (f" (Part {part_num}/{total_parts})" if total_parts > 1 else "")
-        embeds_to_send.append({
-            "title": embed_title,
-            "description": current_desc,
-            "color": 0x2ECC71,
-            "footer": {"text": footer_text_main} if part_num == 1 else {}
-        })
-
-    payload = {
-        "username": username,
-        "embeds": embeds_to_send
-    }
-    try:
-        response = requests.post(webhook_url, json=payload, timeout=30)
-        response.raise_for_status()
-        logging.info("Discord notification sent successfully.")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error sending Discord notification: {e}")
-        if e.response is not None:
-            logging.error(f"Discord Response: {e.response.text}")
-    except Exception as e:
-        logging.error(f"Unexpected error sending Discord notification: {e}")
+    title_prefix = f"🚀 ZT-3 Breakout Alert ({stock_count} Stocks) - {screening_date_str}"
+
+    # Shortlisted stocks passed every rule, so 'symbol' and 'close' are always populated
+    lines = [f"**{stock['symbol']}** - ₹{stock['close']:.2f}\n" for stock in shortlisted_stocks]
+
+    # The first embed also carries the note
+    ranges = _chunk_line_ranges(lines, MAX_LINES_PER_EMBED, MAX_CHARS_PER_EMBED, first_offset=len(note))
+
+    total_parts = len(ranges)
+
+    def make_embed(description, part_num):
+        """Builds one alert embed; only the first part carries the note and footer."""
+        return {
+            "title": title_prefix + (f" (Part {part_num}/{total_parts})" if total_parts > 1 else ""),
+            "description": note + description if part_num == 1 else description,
+            "color": COLOR_ALERT,
+            "footer": {"text": footer_text} if part_num == 1 else {}
+        }
+
+    embeds_to_send = [make_embed("".join(lines[part_start:part_end]), part_num)
+                      for part_num, (part_start, part_end) in enumerate(ranges, 1)]
+
+    # Build every message payload up front, then post them in order so the parts arrive in sequence
+    payloads = [{"username": DISCORD_USERNAME, "embeds": group} for group in _group_embeds(embeds_to_send)]
+    for msg_num, payload in enumerate(payloads, 1):
+        msg_label = f" (message {msg_num}/{len(payloads)})" if len(payloads) > 1 else ""
+        try:
+            post_discord_webhook(webhook_url, payload)
+            logging.info(f"Discord notification sent successfully{msg_label}.")
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error sending Discord notification{msg_label}: {e}")
+            if e.response is not None:
+                logging.error(f"Discord Response: {e.response.text}")
+        except Exception as e:
+            logging.error(f"Unexpected error sending Discord notification{msg_label}: {e}")
 
 # Example usage (for testing later)
 if __name__ == '__main__':
-    # ... (Keep existing test setup but add failure report testing) ...
     logging.info("Testing discord_notifier module...")
 
     dummy_stocks_notify = [
@@ -145,49 +267,15 @@ if __name__ == '__main__':
     ]
     dummy_duration = 125.67
 
-    # Create dummy success and failure report files
-    dummy_report_dir = config.settings['paths']['report_dir']
-    os.makedirs(dummy_report_dir, exist_ok=True)
-    dummy_success_report_file = os.path.join(dummy_report_dir, "dummy_success_report_test.html")
-    dummy_failure_report_file = os.path.join(dummy_report_dir, "dummy_failure_report_test.html")
-
-    try:
-        with open(dummy_success_report_file, "w") as f: f.write("<html><body><h1>Success Report</h1></body></html>")
-        with open(dummy_failure_report_file, "w") as f: f.write("<html><body><h1>Failure Analysis</h1></body></html>")
-        logging.info("Created dummy report files.")
-    except Exception as e:
-        logging.error(f"Failed to create dummy report files: {e}")
-        dummy_success_report_file = None
-        dummy_failure_report_file = None
-
-    logging.info("\n--- Testing Stocks Found Notification (with duration and BOTH attachments) ---") # Updated test description
     if not config.get_discord_webhook_url():
-         logging.warning("Skipping test: DISCORD_WEBHOOK_URL not set in .env")
-    elif dummy_success_report_file and dummy_failure_report_file: # Check both files exist
-        send_discord_notification(dummy_stocks_notify, dummy_success_report_file, dummy_failure_report_file, dummy_duration) # Pass both files
-        logging.info("Test notification sent (check Discord).")
+        logging.warning("Skipping tests: DISCORD_WEBHOOK_URL not set in .env")
     else:
-        logging.warning("Skipping dual attachment test: one or both dummy files not created.")
-
+        logging.info("\n--- Testing Stocks Found Notification (with duration) ---")
+        send_discord_notification(dummy_stocks_notify, duration_seconds=dummy_duration)
+        logging.info("Test notification sent (check Discord).")
 
-    # Test case with no stocks (with failure attachment)
-    logging.info("\n--- Testing No Stocks Notification (with duration and failure attachment) ---")
-    if not config.get_discord_webhook_url():
-         logging.warning("Skipping test: DISCORD_WEBHOOK_URL not set in .env")
-    elif dummy_failure_report_file:
-        send_discord_notification([], None, dummy_failure_report_file, dummy_duration) # Pass failure file
+        logging.info("\n--- Testing No Stocks Notification (with duration) ---")
+        send_discord_notification([], duration_seconds=dummy_duration)
         logging.info("Test 'No Results' notification sent (check Discord).")
-    else:
-        logging.warning("Skipping failure attachment test: dummy file not created.")
-
-
-    # Clean up dummy files
-    for f in [dummy_success_report_file, dummy_failure_report_file]:
-        if f and os.path.exists(f):
-            try:
-                os.remove(f)
-                logging.info(f"Removed dummy report file: {f}")
-            except Exception as e:
-                logging.error(f"Failed to remove dummy report file {f}: {e}")
 
     logging.info("\nDiscord_notifier module test finished.")
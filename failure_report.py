@@ -1,7 +1,7 @@
 import os
 from datetime import datetime
-import pandas as pd
-from utils.helpers import logging, get_report_filename
+from operator import itemgetter
+from utils.helpers import logging, get_report_filename, remove_partial_report
 import config
 
 # --- Constants from config.settings ---
@@ -26,205 +26,216 @@ TOTAL_RULES = 5
 # Maximum number of failed rules to be included in the report
 MAX_FAILED_RULES = 2
 
-def generate_failure_report(failed_stocks, filename, min_rules_passed=0):
-    """
-    Generates an HTML report detailing stocks that failed screening and why.
-    
-    Args:
-        failed_stocks (list): List of dictionaries with stock information and failure reasons.
-        filename (str): Path where the HTML report should be saved.
-        min_rules_passed (int, optional): Minimum number of rules that must be passed to include in report. Defaults to 0.
-    """
-    report_dir = os.path.dirname(filename)
-    os.makedirs(report_dir, exist_ok=True)
-    
-    # Handle None value for min_rules_passed
-    if min_rules_passed is None:
-        min_rules_passed = 0
-        
-    # Filter stocks based on min_rules_passed if specified
-    if min_rules_passed > 0:
-        failed_stocks = [s for s in failed_stocks if s.get('rules_passed_count', 0) >= min_rules_passed]
-    
-    # NEW: Filter stocks to only show ones that failed at most MAX_FAILED_RULES rules
-    # This means we only show stocks that passed at least (TOTAL_RULES - MAX_FAILED_RULES) rules
-    min_rules_to_show = TOTAL_RULES - MAX_FAILED_RULES
-    failed_stocks = [s for s in failed_stocks if s.get('rules_passed_count', 0) >= min_rules_to_show]
-    
-    # Track the total count before filtering for reporting
-    original_count = len(failed_stocks)
-    
-    screening_date = datetime.now().strftime("%Y-%m-%d")
-    if failed_stocks and 'timestamp' in failed_stocks[0]:
-        dates = [s.get('timestamp') for s in failed_stocks if s.get('timestamp')]
-        if dates:
-            screening_date = max(dates).strftime("%Y-%m-%d")
-    
-    # Read data and perform basic analysis
-    total_failed = len(failed_stocks)
-    
-    # Create rule-specific failure counts
-    rule_failures = {
-        'rule1': 0,  # Trend Alignment: Close > EMA(20) > EMA(50) 
-        'rule2': 0,  # Proximity to 50-Day High: 0% < Drop < 10%
-        'rule3': 0,  # Volume Ratio: 2.0x < Ratio < 2.5x
-        'rule4': 0,   # Price Range: 25 < Close < 1500
-        'rule5': 0    # Closing > Opening (Buying Volume)
-    }
-    
-    # Count failures by rule
-    for stock in failed_stocks:
-        if not stock.get('passed_rule1', True):
-            rule_failures['rule1'] += 1
-        if not stock.get('passed_rule2', True):
-            rule_failures['rule2'] += 1
-        if not stock.get('passed_rule3', True):
-            rule_failures['rule3'] += 1
-        if not stock.get('passed_rule4', True):
-            rule_failures['rule4'] += 1
-        if not stock.get('passed_rule5', True):
-            rule_failures['rule5'] += 1
-    
-    # Calculate statistics
-    almost_passed = len([s for s in failed_stocks if s.get('rules_passed_count', 0) == TOTAL_RULES - 1])
-    reasonably_close = len([s for s in failed_stocks if s.get('rules_passed_count', 0) == TOTAL_RULES - 2])
-    
-    # Create HTML content
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Failure Analysis Report - {screening_date}</title>
-    <style>
-        body {{
+# Static <style> block for the failure report
+FAILURE_REPORT_STYLE = """    <style>
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             margin: 0;
             padding: 20px;
             background-color: #f8f9fa;
             color: #212529;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             background-color: #ffffff;
             padding: 30px;
             border-radius: 8px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1, h2 {{
+        }
+        h1, h2 {
             color: #007bff;
             margin-top: 0;
-        }}
-        .stats-box {{
+        }
+        .stats-box {
             background-color: #f8f9fa;
             border-radius: 8px;
             padding: 20px;
             margin-bottom: 20px;
             border-left: 4px solid #007bff;
-        }}
-        .stats-grid {{
+        }
+        .stats-grid {
             display: grid;
             grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
             gap: 15px;
             margin-top: 15px;
-        }}
-        .stat-card {{
+        }
+        .stat-card {
             background-color: #ffffff;
             border-radius: 6px;
             padding: 15px;
             box-shadow: 0 1px 3px rgba(0,0,0,0.1);
             text-align: center;
-        }}
-        .stat-card h3 {{
+        }
+        .stat-card h3 {
             margin-top: 0;
             color: #6c757d;
             font-size: 1em;
             font-weight: normal;
-        }}
-        .stat-value {{
+        }
+        .stat-value {
             font-size: 2em;
             font-weight: bold;
             color: #343a40;
             margin: 10px 0;
-        }}
-        .stat-percent {{
+        }
+        .stat-percent {
             font-size: 0.9em;
             color: #6c757d;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
             margin-top: 20px;
             font-size: 0.9em;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #dee2e6;
             padding: 8px 12px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background-color: #e9ecef;
             color: #495057;
             font-weight: 600;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background-color: #f8f9fa;
-        }}
-        tr:hover {{
+        }
+        tr:hover {
             background-color: #e2e6ea;
-        }}
-        .footer {{
+        }
+        .footer {
             margin-top: 30px;
             text-align: center;
             color: #6c757d;
             font-size: 0.9em;
-        }}
-        .rule-desc {{
+        }
+        .rule-desc {
             font-size: 0.9em;
             color: #6c757d;
             margin-top: 5px;
-        }}
-        .almost-passed {{
+        }
+        .almost-passed {
             background-color: #fff3cd;
-        }}
-        .reasonably-close {{
+        }
+        .reasonably-close {
             background-color: #d1ecf1;
-        }}
-        .rule-indicator {{
+        }
+        .rule-indicator {
             width: 15px;
             height: 15px;
             display: inline-block;
             margin-right: 5px;
             border-radius: 50%;
-        }}
-        .pass {{
+        }
+        .pass {
             background-color: #28a745;
-        }}
-        .fail {{
+        }
+        .fail {
             background-color: #dc3545;
-        }}
-        .note {{
+        }
+        .note {
             padding: 10px;
             background-color: #e2e3e5;
             border-radius: 4px;
             margin-bottom: 20px;
             font-style: italic;
-        }}
-        @media (max-width: 768px) {{
-            .stats-grid {{
+        }
+        @media (max-width: 768px) {
+            .stats-grid {
                 grid-template-columns: 1fr;
-            }}
-            .container {{
+            }
+            .container {
                 padding: 15px;
-            }}
-            table {{
+            }
+            table {
                 display: block;
                 overflow-x: auto;
-            }}
-        }}
-    </style>
+            }
+        }
+    </style>"""
+
+# Escapes the characters that would break table markup; str.translate does it in one pass
+HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+def _is_number(value):
+    """True for real int/float values; NaN is the only float not equal to itself."""
+    return isinstance(value, (int, float)) and value == value
+
+def generate_failure_report(failed_stocks, filename, min_rules_passed=0):
+    """
+    Generates an HTML report detailing stocks that failed screening and why.
+    
+    Args:
+        failed_stocks (list): List of dictionaries with stock information and failure reasons.
+        filename (str): Path where the HTML report should be saved.
+        min_rules_passed (int, optional): Minimum number of rules that must be passed to include in report. Defaults to 0.
+    """
+    report_dir = os.path.dirname(filename)
+    os.makedirs(report_dir, exist_ok=True)
+    
+    # Handle None value for min_rules_passed
+    if min_rules_passed is None:
+        min_rules_passed = 0
+        
+    # Filter stocks to only show ones that failed at most MAX_FAILED_RULES rules
+    # This means we only show stocks that passed at least (TOTAL_RULES - MAX_FAILED_RULES) rules,
+    # or min_rules_passed if that is stricter - both filters are applied in a single pass
+    min_rules_to_show = max(TOTAL_RULES - MAX_FAILED_RULES, min_rules_passed)
+    failed_stocks = [s for s in failed_stocks if s.get('rules_passed_count', 0) >= min_rules_to_show]
+    
+    # Track the total count before filtering for reporting
+    original_count = len(failed_stocks)
+    
+    screening_date = datetime.now().strftime("%Y-%m-%d")
+    if failed_stocks and 'timestamp' in failed_stocks[0]:
+        dates = [s.get('timestamp') for s in failed_stocks if s.get('timestamp')]
+        if dates:
+            screening_date = max(dates).strftime("%Y-%m-%d")
+    
+    # Read data and perform basic analysis
+    total_failed = len(failed_stocks)
+    
+    # Create rule-specific failure counts
+    rule_failures = {
+        'rule1': 0,  # Trend Alignment: Close > EMA(20) > EMA(50) 
+        'rule2': 0,  # Proximity to 50-Day High: 0% < Drop < 10%
+        'rule3': 0,  # Volume Ratio: 2.0x < Ratio < 2.5x
+        'rule4': 0,   # Price Range: 25 < Close < 1500
+        'rule5': 0    # Closing > Opening (Buying Volume)
+    }
+    
+    almost_passed = 0     # Failed 1 rule
+    reasonably_close = 0  # Failed 2 rules
+    
+    # Count failures by rule and how close each stock came, in one pass
+    for stock in failed_stocks:
+        rules_passed = stock.get('rules_passed_count', 0)
+        if rules_passed == TOTAL_RULES - 1:
+            almost_passed += 1
+        elif rules_passed == TOTAL_RULES - 2:
+            reasonably_close += 1
+        if not stock.get('passed_rule1', True):
+            rule_failures['rule1'] += 1
+        if not stock.get('passed_rule2', True):
+            rule_failures['rule2'] += 1
+        if not stock.get('passed_rule3', True):
+            rule_failures['rule3'] += 1
+        if not stock.get('passed_rule4', True):
+            rule_failures['rule4'] += 1
+        if not stock.get('passed_rule5', True):
+            rule_failures['rule5'] += 1
+    
+    # Create HTML content; the header, rows and footer are written to the file piece by piece
+    html_header = f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Failure Analysis Report - {screening_date}</title>
+{FAILURE_REPORT_STYLE}
 </head>
 <body>
     <div class="container">
@@ -307,40 +318,43 @@ def generate_failure_report(failed_stocks, filename, min_rules_passed=0):
             <tbody>
 """
     
-    # Sort by number of rules passed (descending)
-    sorted_stocks = sorted(failed_stocks, key=lambda x: x.get('rules_passed_count', 0), reverse=True)
+    # Sort by number of rules passed (descending); the filter above only keeps stocks that have the count
+    sorted_stocks = sorted(failed_stocks, key=itemgetter('rules_passed_count'), reverse=True)
     
-    for stock in sorted_stocks:
-        symbol = stock.get('symbol', 'N/A')
-        close = stock.get('close', 0)
-        metrics = stock.get('metrics', {})
-        price_drop_pct = metrics.get('price_drop_pct', 0)
-        volume_ratio = metrics.get('volume_ratio', 0)
-        rules_passed = stock.get('rules_passed_count', 0)
-        reason = stock.get('reason', 'Unknown')
+    def render_rows():
+        """Yields one table row per stock so rows go to the file as they are formatted."""
+        for stock in sorted_stocks:
+            get = stock.get  # Bound once per row; used for every field lookup below
+            symbol = str(get('symbol', 'N/A')).translate(HTML_ESCAPE_TABLE)
+            close = get('close', 0)
+            metrics = get('metrics', {})
+            price_drop_pct = metrics.get('price_drop_pct', 0)
+            volume_ratio = metrics.get('volume_ratio', 0)
+            rules_passed = get('rules_passed_count', 0)
+            reason = str(get('reason', 'Unknown')).translate(HTML_ESCAPE_TABLE)  # e.g. exception text
         
-        # Determine row class based on how close it was to passing
-        if rules_passed == TOTAL_RULES - 1:
-            row_class = "almost-passed"  # Failed just 1 rule
-        elif rules_passed == TOTAL_RULES - 2:
-            row_class = "reasonably-close"  # Failed 2 rules
-        else:
-            row_class = ""
+            # Determine row class based on how close it was to passing
+            if rules_passed == TOTAL_RULES - 1:
+                row_class = "almost-passed"  # Failed just 1 rule
+            elif rules_passed == TOTAL_RULES - 2:
+                row_class = "reasonably-close"  # Failed 2 rules
+            else:
+                row_class = ""
         
-        # Create indicators for each rule
-        rule1_class = "pass" if stock.get('passed_rule1', False) else "fail"
-        rule2_class = "pass" if stock.get('passed_rule2', False) else "fail"
-        rule3_class = "pass" if stock.get('passed_rule3', False) else "fail"
-        rule4_class = "pass" if stock.get('passed_rule4', False) else "fail"
-        rule5_class = "pass" if stock.get('passed_rule5', False) else "fail"
+            # Create indicators for each rule
+            rule1_class = "pass" if get('passed_rule1', False) else "fail"
+            rule2_class = "pass" if get('passed_rule2', False) else "fail"
+            rule3_class = "pass" if get('passed_rule3', False) else "fail"
+            rule4_class = "pass" if get('passed_rule4', False) else "fail"
+            rule5_class = "pass" if get('passed_rule5', False) else "fail"
         
-        # Safe formatting - handle None and other invalid values
-        close_str = f"{close:.2f}" if isinstance(close, (int, float)) and not pd.isna(close) else "N/A"
-        drop_str = f"{price_drop_pct:.2f}%" if isinstance(price_drop_pct, (int, float)) and not pd.isna(price_drop_pct) else "N/A"
-        ratio_str = f"{volume_ratio:.2f}x" if isinstance(volume_ratio, (int, float)) and not pd.isna(volume_ratio) else "N/A"
+            # Safe formatting - handle None and other invalid values
+            close_str = f"{close:.2f}" if _is_number(close) else "N/A"
+            drop_str = f"{price_drop_pct:.2f}%" if _is_number(price_drop_pct) else "N/A"
+            ratio_str = f"{volume_ratio:.2f}x" if _is_number(volume_ratio) else "N/A"
         
-        # Create the row
-        html_content += f"""
+            # Create the row
+            yield f"""
                 <tr class="{row_class}">
                     <td>{symbol}</td>
                     <td>{close_str}</td>
@@ -356,7 +370,7 @@ def generate_failure_report(failed_stocks, filename, min_rules_passed=0):
                 </tr>"""
     
     # Close the HTML
-    html_content += """
+    html_footer = """
             </tbody>
         </table>
         
@@ -368,13 +382,19 @@ def generate_failure_report(failed_stocks, filename, min_rules_passed=0):
 </html>
 """
     
+    # Write to a temp file and swap it in, so a failed rerun leaves the existing report untouched
+    tmp_filename = filename + '.tmp'
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        with open(tmp_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(html_header)
+            f.writelines(render_rows())
+            f.write(html_footer)
+        os.replace(tmp_filename, filename)
         logging.info(f"Failure analysis report generated: {filename}")
         return True
     except Exception as e:
         logging.error(f"Error generating failure report: {e}")
+        remove_partial_report(tmp_filename)
         return False
 
 if __name__ == "__main__":
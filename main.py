@@ -12,7 +12,7 @@ if project_root not in sys.path:
 # Import project modules
 import config
 from utils.helpers import logging, load_stock_list, get_report_filename, manage_reports
-from data_fetcher import fetch_historical_data, get_access_token
+from data_fetcher import fetch_historical_data, get_access_token, MAX_CONCURRENT_REQUESTS
 from screener_logic import apply_screening, TOTAL_RULES # Import TOTAL_RULES
 from report_generator import generate_html_report
 from failure_report import generate_failure_report # Import the new function
@@ -25,6 +25,9 @@ FETCH_INTERVAL = 'day' # Daily candles
 # Ensure buffer is sufficient for 50-day EMA/Avg Vol
 LOOKBACK_DAYS = config.settings['screener']['lookback_period'] + 40 # Keep buffer, lookback_period is now 50
 
+# Parallel fetch+screen workers; more than the fetcher's connection pool would just queue for a connection
+FETCH_WORKERS = max(1, min(config.settings.get('upstox', {}).get('fetch_workers', 2), MAX_CONCURRENT_REQUESTS))
+
 # Constants for instrument key construction (assuming NSE Equity)
 EXCHANGE = "NSE"
 INSTRUMENT_TYPE = "EQ"
@@ -69,6 +72,7 @@ def run_screener():
     logging.info("--- Starting Data Fetching and Screening (Parallel) ---")
     screening_start_time = time.time()  # Start time for screening loop
     all_screening_results = []
+    shortlisted_stocks = [] # Stocks passing every rule, collected in the same pass
     fetch_errors = 0
 
     def process_stock(stock, to_date_str, from_date_str):
@@ -107,22 +111,21 @@ def run_screener():
                 'rules_passed_count': 0
             }
 
-    # Use 2 workers instead of 3 to reduce burst load
-    with ThreadPoolExecutor(max_workers=2) as executor:
+    # Defaults to 2 workers to keep burst load on the API low; raise upstox.fetch_workers in config.yaml to go wider
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
         futures = {executor.submit(process_stock, stock, to_date_str, from_date_str): stock for stock in stocks_to_scan}
         for future in as_completed(futures):
             res = future.result()
             if res is not None:
                 all_screening_results.append(res)
+                if not res.get('failed_overall', True):
+                    shortlisted_stocks.append(res)
             else:
                 fetch_errors += 1
 
     screening_end_time = time.time()  # End time for screening loop
     screening_duration_seconds = screening_end_time - screening_start_time
 
-    # Filter successful stocks from all results
-    shortlisted_stocks = [res for res in all_screening_results if not res.get('failed_overall', True)]
-
     logging.info("="*50)
     logging.info("Screening Complete")
     logging.info(f"Total Stocks Processed: {len(stocks_to_scan)}")
@@ -158,14 +161,20 @@ def run_screener():
         logging.info(f"Failure analysis report generated: {failure_report_filename}")
     else:
         failure_report_filename = None
-    # --- Publish Report to GitHub Pages ---
-    publish_both_reports(report_filename, failure_report_filename)
-
-    # 5. Send Discord Notification
-    send_discord_notification(
-        shortlisted_stocks,
-        duration_seconds=screening_duration_seconds
-    )
+    # --- Publish Report to GitHub Pages & 5. Send Discord Notification ---
+    # The notification only carries links, so it can go out while the git push is still running
+    with ThreadPoolExecutor(max_workers=1) as notify_executor:
+        notify_future = notify_executor.submit(
+            send_discord_notification,
+            shortlisted_stocks,
+            duration_seconds=screening_duration_seconds,
+            trading_date=canonical_trading_date
+        )
+        publish_both_reports(report_filename, failure_report_filename)
+    try:
+        notify_future.result()
+    except Exception as e:
+        logging.error(f"Discord notification failed: {e}")
 
     overall_end_time = time.time() # End time for the whole process
     overall_duration_seconds = overall_end_time - overall_start_time
@@ -1,23 +1,19 @@
 import os
 from datetime import datetime
-import math
-import numpy as np # Import numpy to check its types
 import config
-from utils.helpers import logging, get_report_filename, manage_reports
+from utils.helpers import logging, get_report_filename, manage_reports, remove_partial_report
 
 def _format_volume(volume_val):
     """Helper to format volume consistently."""
-    if isinstance(volume_val, (int, float, np.integer, np.floating)) and not math.isnan(volume_val):
-        try:
-            return f"{int(volume_val):,}"
-        except (ValueError, TypeError):
+    # Fast path: volume is normally already numeric (Python or numpy), so just convert it
+    try:
+        if volume_val != volume_val: # NaN is the only value not equal to itself
             return 'N/A'
-    elif isinstance(volume_val, str) and volume_val.isdigit():
-        try:
-            return f"{int(volume_val):,}"
-        except (ValueError, TypeError):
+        if isinstance(volume_val, str) and not volume_val.isdigit():
             return 'N/A'
-    return 'N/A'
+        return f"{int(volume_val):,}"
+    except (ValueError, TypeError, OverflowError):
+        return 'N/A'
 
 # --- Constants from config.settings ---
 screener_config = config.settings['screener'] # Get the screener sub-dictionary
@@ -27,71 +23,18 @@ AVG_VOLUME_LOOKBACK_REPORT = screener_config.get('avg_volume_lookback', 50) # Us
 EMA_PERIOD_LONG_REPORT = screener_config.get('ema_period_long', 50)
 EMA_PERIOD_SHORT_REPORT = screener_config.get('ema_period_short', 20)
 
-def generate_html_report(shortlisted_stocks, filename):
-    # Always create a report, even when no stocks are shortlisted
-    report_dir = os.path.dirname(filename)
-    os.makedirs(report_dir, exist_ok=True)
-
-    screening_date_str = "N/A"
-    if shortlisted_stocks:
-        dates = [s.get('timestamp') for s in shortlisted_stocks if s.get('timestamp')]
-        screening_date_str = max(dates).strftime('%Y-%m-%d') if dates else datetime.now().strftime('%Y-%m-%d')
-    else:
-         screening_date_str = datetime.now().strftime('%Y-%m-%d')
-
-    # If no stocks passed, craft a minimal content with a clear message and failure report link.
-    if not shortlisted_stocks:
-         # Use day-specific filename for failure report link
-         date_for_link = screening_date_str.replace("-", "")  # e.g. "20250430"
-         failure_report_link = f"failure_report_{date_for_link}.html"
-         html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Daily Screener Report - {screening_date_str}</title>
-    <style>
-        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f8f9fa; color: #212529; padding: 20px; }}
-        .container {{ max-width: 800px; margin: 0 auto; background-color: #ffffff; padding: 30px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); text-align: center; }}
-        a {{ color: #007bff; text-decoration: none; }}
-        a:hover {{ text-decoration: underline; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Daily Screener Report</h1>
-        <p class="subtitle">Screening Date: {screening_date_str}</p>
-        <p>No stocks passed the screening criteria today.</p>
-        <p>Please review the <a href="{failure_report_link}" target="_blank">Failure Analysis Report</a> for further details.</p>
-        <div class="footer">
-            Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        </div>
-    </div>
-</body>
-</html>
-         """
-    else:
-         # Compute day-specific failure report link using screening_date_str
-         date_for_link = screening_date_str.replace("-", "")
-         html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Daily Screener Report - {screening_date_str}</title>
-    <style>
+# Static <style> block for the shortlist report
+REPORT_STYLE = """    <style>
         /* ... existing styles ... */
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             margin: 0;
             padding: 0;
             background-color: #f8f9fa;
             color: #212529;
             font-size: 14px;
-        }}
-        .container {{
+        }
+        .container {
             width: 100%;
             margin: 0 auto;
             background-color: #ffffff;
@@ -99,41 +42,41 @@ def generate_html_report(shortlisted_stocks, filename):
             box-sizing: border-box;
             box-shadow: none;
             border-radius: 0;
-        }}
-        h1 {{
+        }
+        h1 {
             text-align: center;
             color: #007bff;
             margin-bottom: 5px;
             font-size: 1.5em;
-        }}
-        p.subtitle {{
+        }
+        p.subtitle {
             text-align: center;
             color: #6c757d;
             margin-top: 0;
             margin-bottom: 20px;
             font-size: 1em;
-        }}
-        .table-container {{
+        }
+        .table-container {
             overflow-x: auto;
             -webkit-overflow-scrolling: touch;
             margin: 0 -15px;
             padding: 0 15px;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             min-width: 800px; /* Adjusted min-width for more columns */
             border-collapse: collapse;
             margin-top: 15px;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #dee2e6;
             padding: 12px 15px;
             text-align: left;
             vertical-align: middle;
             white-space: nowrap;
             font-size: 1.5em; /* Mobile font size */
-        }}
-        th {{
+        }
+        th {
             background-color: #e9ecef;
             color: #495057;
             font-weight: 600;
@@ -142,10 +85,10 @@ def generate_html_report(shortlisted_stocks, filename):
             position: sticky;
             top: 0;
             z-index: 1;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background-color: #f8f9fa;
-        }}
+        }
 
         /* Adjust alignment for new columns */
         td:nth-child(4), /* Open Price */
@@ -157,62 +100,121 @@ def generate_html_report(shortlisted_stocks, filename):
         td:nth-child(10), /* Volume */
         td:nth-child(11), /* Avg Vol */
         td:nth-child(12)  /* Vol Ratio */
-        {{
+        {
             text-align: right;
-        }}
+        }
 
-        .footer {{
+        .footer {
             margin-top: 20px;
             font-size: 0.8em;
             text-align: center;
             color: #6c757d;
             padding: 10px 15px;
-        }}
+        }
 
         /* Desktop Styles */
-        @media (min-width: 768px) {{
-            body {{
+        @media (min-width: 768px) {
+            body {
                 padding: 20px;
                 font-size: 16px;
-            }}
-            .container {{
+            }
+            .container {
                 max-width: 1400px; /* Wider container for more columns */
                 margin: 20px auto;
                 padding: 30px;
                 border-radius: 8px;
                 box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            h1 {{
+            }
+            h1 {
                 font-size: 2em;
                 margin-bottom: 10px;
-            }}
-            p.subtitle {{
+            }
+            p.subtitle {
                 font-size: 1.1em;
                 margin-bottom: 30px;
-            }}
-            .table-container {{
+            }
+            .table-container {
                  margin: 0;
                  padding: 0;
-            }}
-            table {{
+            }
+            table {
                 min-width: auto;
-            }}
-            th, td {{
+            }
+            th, td {
                 padding: 12px 15px;
                 white-space: normal;
                 font-size: 0.95em; /* Restore desktop table font size */
-            }}
-            tr:hover {{
+            }
+            tr:hover {
                 background-color: #e2e6ea;
-            }}
-            .footer {{
+            }
+            .footer {
                 margin-top: 30px;
                 font-size: 0.9em;
                 padding: 0;
-            }}
-        }}
+            }
+        }
+    </style>"""
+
+def generate_html_report(shortlisted_stocks, filename):
+    # Always create a report, even when no stocks are shortlisted
+    report_dir = os.path.dirname(filename)
+    os.makedirs(report_dir, exist_ok=True)
+
+    screening_date_str = "N/A"
+    if shortlisted_stocks:
+        dates = [s.get('timestamp') for s in shortlisted_stocks if s.get('timestamp')]
+        screening_date_str = max(dates).strftime('%Y-%m-%d') if dates else datetime.now().strftime('%Y-%m-%d')
+    else:
+         screening_date_str = datetime.now().strftime('%Y-%m-%d')
+
+    # The page is written as header, rows and footer so the rows never sit in one big string.
+    # If no stocks passed, craft a minimal content with a clear message and failure report link.
+    if not shortlisted_stocks:
+         # Use day-specific filename for failure report link
+         date_for_link = screening_date_str.replace("-", "")  # e.g. "20250430"
+         failure_report_link = f"failure_report_{date_for_link}.html"
+         html_content = f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Daily Screener Report - {screening_date_str}</title>
+    <style>
+        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background-color: #f8f9fa; color: #212529; padding: 20px; }}
+        .container {{ max-width: 800px; margin: 0 auto; background-color: #ffffff; padding: 30px; border-radius: 8px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); text-align: center; }}
+        a {{ color: #007bff; text-decoration: none; }}
+        a:hover {{ text-decoration: underline; }}
     </style>
 </head>
+<body>
+    <div class="container">
+        <h1>Daily Screener Report</h1>
+        <p class="subtitle">Screening Date: {screening_date_str}</p>
+        <p>No stocks passed the screening criteria today.</p>
+        <p>Please review the <a href="{failure_report_link}" target="_blank">Failure Analysis Report</a> for further details.</p>
+        <div class="footer">
+            Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        </div>
+    </div>
+</body>
+</html>
+         """
+         html_rows = ()
+         html_footer = ""
+    else:
+         # Compute day-specific failure report link using screening_date_str
+         date_for_link = screening_date_str.replace("-", "")
+         html_content = f"""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Daily Screener Report - {screening_date_str}</title>
+{REPORT_STYLE}
+</head>
 <body>
     <div class="container">
         <h1>Daily Screener Report</h1>
@@ -240,47 +242,54 @@ def generate_html_report(shortlisted_stocks, filename):
                 <tbody>
 """
 
-         for i, stock in enumerate(shortlisted_stocks):
-             # Access metrics dictionary
-             metrics = stock.get('metrics', {})
-             # Use the helper for current and average volume
-             volume_str = _format_volume(stock.get('volume'))
-             avg_volume_str = _format_volume(stock.get('avg_volume_50d')) # Use updated key name
-             isin_val = stock.get('isin', 'N/A')
-             # Access volume_ratio from the metrics dictionary
-             volume_ratio_val = metrics.get('volume_ratio', 0.0) # Corrected access
-             ema_20_val = metrics.get('ema_20', 0.0) # Get EMA(20)
-             ema_50_val = metrics.get('ema_50', 0.0) # Get EMA(50)
-             
-             # Get open price from metrics or stock directly
-             open_price = metrics.get('open_price', stock.get('open', 0.0))
-             
-             # Get symbol and create TradingView URL
-             symbol = stock.get('symbol', 'N/A')
-             tradingview_url = f"https://www.tradingview.com/chart/?symbol=NSE%3A{symbol}"
+         def render_rows():
+             """Yields one table row per shortlisted stock."""
+             for i, stock in enumerate(shortlisted_stocks):
+                 # Bind the lookups once per row; every field below goes through them
+                 get = stock.get
+                 # Access metrics dictionary
+                 metrics_get = get('metrics', {}).get
+                 # Use the helper for current and average volume
+                 volume_str = _format_volume(get('volume'))
+                 avg_volume_str = _format_volume(get('avg_volume_50d')) # Use updated key name
+                 isin_val = get('isin', 'N/A')
+                 close_val = get('close', 0.0)
+                 period_high_val = get('period_high', 0.0)
+                 # Access volume_ratio from the metrics dictionary
+                 volume_ratio_val = metrics_get('volume_ratio', 0.0) # Corrected access
+                 ema_20_val = metrics_get('ema_20', 0.0) # Get EMA(20)
+                 ema_50_val = metrics_get('ema_50', 0.0) # Get EMA(50)
+                 
+                 # Get open price from metrics or stock directly
+                 open_price = metrics_get('open_price', get('open', 0.0))
+                 
+                 # Get symbol and create TradingView URL
+                 symbol = get('symbol', 'N/A')
+                 tradingview_url = f"https://www.tradingview.com/chart/?symbol=NSE%3A{symbol}"
 
-             # Add price drop percentage to display
-             price_drop_pct = metrics.get('price_drop_pct', 0.0)
+                 # Add price drop percentage to display
+                 price_drop_pct = metrics_get('price_drop_pct', 0.0)
 
-             # Construct the table row string explicitly
-             row_html = "<tr>"
-             row_html += f"<td>{i+1}</td>"
-             row_html += f"<td><a href=\"{tradingview_url}\" target=\"_blank\">{symbol}</a></td>"
-             row_html += f"<td>{isin_val}</td>"
-             row_html += f"<td style='text-align: right;'>{open_price:.2f}</td>"  # Add Open price
-             row_html += f"<td style='text-align: right;'>{stock.get('close', 0.0):.2f}</td>"
-             row_html += f"<td style='text-align: right;'>{ema_20_val:.2f}</td>" # Add EMA(20) value
-             row_html += f"<td style='text-align: right;'>{ema_50_val:.2f}</td>" # Add EMA(50) value
-             row_html += f"<td style='text-align: right;'>{stock.get('period_high', 0.0):.2f}</td>" # Use period_high
-             row_html += f"<td style='text-align: right;'>{price_drop_pct:.2f}%</td>" # Show price drop %
-             row_html += f"<td style='text-align: right;'>{volume_str}</td>"
-             row_html += f"<td style='text-align: right;'>{avg_volume_str}</td>" # Add avg volume (50d)
-             row_html += f"<td style='text-align: right;'>{volume_ratio_val:.2f}x</td>" # Add volume ratio (Corrected)
-             row_html += "</tr>\n"
+                 # Construct the table row string explicitly
+                 row_html = "<tr>"
+                 row_html += f"<td>{i+1}</td>"
+                 row_html += f"<td><a href=\"{tradingview_url}\" target=\"_blank\">{symbol}</a></td>"
+                 row_html += f"<td>{isin_val}</td>"
+                 row_html += f"<td style='text-align: right;'>{open_price:.2f}</td>"  # Add Open price
+                 row_html += f"<td style='text-align: right;'>{close_val:.2f}</td>"
+                 row_html += f"<td style='text-align: right;'>{ema_20_val:.2f}</td>" # Add EMA(20) value
+                 row_html += f"<td style='text-align: right;'>{ema_50_val:.2f}</td>" # Add EMA(50) value
+                 row_html += f"<td style='text-align: right;'>{period_high_val:.2f}</td>" # Use period_high
+                 row_html += f"<td style='text-align: right;'>{price_drop_pct:.2f}%</td>" # Show price drop %
+                 row_html += f"<td style='text-align: right;'>{volume_str}</td>"
+                 row_html += f"<td style='text-align: right;'>{avg_volume_str}</td>" # Add avg volume (50d)
+                 row_html += f"<td style='text-align: right;'>{volume_ratio_val:.2f}x</td>" # Add volume ratio (Corrected)
+                 row_html += "</tr>\n"
 
-             html_content += row_html # Append the constructed row
+                 yield row_html # Hand the constructed row straight to the file
 
-         html_content += """
+         html_rows = render_rows()
+         html_footer = """
             </tbody>
           </table>
         </div>
@@ -292,14 +301,21 @@ def generate_html_report(shortlisted_stocks, filename):
     </html>
     """
 
+    # Write to a temp file and swap it in, so a failed rerun leaves the existing report untouched
+    tmp_filename = filename + '.tmp'
     try:
-         with open(filename, 'w', encoding='utf-8') as f:
+         with open(tmp_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
              f.write(html_content)
+             f.writelines(html_rows)
+             f.write(html_footer)
+         os.replace(tmp_filename, filename)
          logging.info(f"HTML report generated successfully: {filename}")
     except IOError as e:
          logging.error(f"Error writing HTML report to {filename}: {e}")
+         remove_partial_report(tmp_filename)
     except Exception as e:
          logging.error(f"An unexpected error occurred during HTML report generation: {e}")
+         remove_partial_report(tmp_filename)
 
 if __name__ == '__main__':
     logging.info("Testing report_generator module...")
@@ -89,14 +89,14 @@ def update_landing_page():
         basename = os.path.basename(filepath)
         try:
             trading_date = basename.split('_')[2].split('.')[0]  # e.g. "20250430"
-            daily_success[trading_date] = filepath  # Later runs overwrite earlier ones.
+            daily_success[trading_date] = basename  # Later runs overwrite earlier ones.
         except Exception as e:
             logging.warning(f"Could not parse trading date from filename {basename}: {e}")
             continue
     sorted_success = sorted(daily_success.keys(), reverse=True)[:5]
     success_links_html = ""
     for day in sorted_success:
-        report_file = os.path.basename(daily_success[day])
+        report_file = daily_success[day]
         try:
             trading_date_obj = datetime.strptime(day, "%Y%m%d")
             link_text = trading_date_obj.strftime("%d %b %Y")
@@ -112,14 +112,14 @@ def update_landing_page():
         basename = os.path.basename(filepath)
         try:
             trading_date = basename.split('_')[2].split('.')[0]
-            daily_failure[trading_date] = filepath
+            daily_failure[trading_date] = basename
         except Exception as e:
             logging.warning(f"Could not parse trading date from filename {basename}: {e}")
             continue
     sorted_failure = sorted(daily_failure.keys(), reverse=True)[:5]
     failure_links_html = ""
     for day in sorted_failure:
-        report_file = os.path.basename(daily_failure[day])
+        report_file = daily_failure[day]
         try:
             trading_date_obj = datetime.strptime(day, "%Y%m%d")
             link_text = trading_date_obj.strftime("%d %b %Y")
@@ -31,6 +31,29 @@ MAX_PRICE = screener_config['max_price']
 # Update total rules count
 TOTAL_RULES = 5
 
+# Short labels used in the 'reason' text for each failed rule, in rule order
+RULE_SHORT_NAMES = {
+    'passed_rule1': "Rule1(Trend)",
+    'passed_rule2': "Rule2(Drop%)",
+    'passed_rule3': "Rule3(VolRatio)",
+    'passed_rule4': "Rule4(PriceRange)",
+    'passed_rule5': "Rule5(BuyVolume)",
+}
+
+def _latest_ema(values, span):
+    """
+    Returns the last value of the span-EMA (adjust=False) of a NaN-free list of floats.
+    Uses the same recurrence as pandas' ewm, so the result is identical, but skips building
+    the whole EMA Series when only the latest value is needed.
+    """
+    alpha = 2.0 / (span + 1)
+    old_wt = 1.0 - alpha
+    weighted = values[0]
+    for cur in values:
+        if weighted != cur: # pandas leaves the average untouched on equal values too
+            weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+    return weighted
+
 def apply_screening(df, symbol):
     """
     Applies the 5 screening conditions and returns detailed results including 
@@ -75,26 +98,32 @@ def apply_screening(df, symbol):
          return results
 
     try:
-        df = df.sort_values('timestamp').reset_index(drop=True)
-
-        # Calculate EMAs
-        df['ema_short'] = df['close'].ewm(span=EMA_PERIOD_SHORT, adjust=False).mean() # EMA(20)
-        df['ema_long'] = df['close'].ewm(span=EMA_PERIOD_LONG, adjust=False).mean()   # EMA(50)
+        # The fetcher already returns candles oldest-first; only sort (a copy) when they aren't
+        if not df['timestamp'].is_monotonic_increasing:
+            df = df.sort_values('timestamp').reset_index(drop=True)
+
+        # Work on the individual columns rather than adding columns to (or slicing rows of) the frame
+        close = df['close']
+        volume = df['volume']
+
+        # Calculate EMAs; only the latest value of each is used. pandas handles the rare NaN gaps.
+        if close.hasnans:
+            latest_ema_short = close.ewm(span=EMA_PERIOD_SHORT, adjust=False).mean().iloc[-1] # EMA(20)
+            latest_ema_long = close.ewm(span=EMA_PERIOD_LONG, adjust=False).mean().iloc[-1]   # EMA(50)
+        else:
+            close_values = close.tolist()
+            latest_ema_short = _latest_ema(close_values, EMA_PERIOD_SHORT) # EMA(20)
+            latest_ema_long = _latest_ema(close_values, EMA_PERIOD_LONG)   # EMA(50)
 
-        latest_candle = df.iloc[-1]
-        latest_close = latest_candle['close']
-        latest_open = latest_candle['open']  # Get the opening price
-        latest_volume = latest_candle['volume']
-        latest_timestamp = latest_candle['timestamp']
-        latest_ema_short = latest_candle['ema_short'] # EMA(20)
-        latest_ema_long = latest_candle['ema_long']   # EMA(50)
+        latest_close = close.iloc[-1]
+        latest_open = df['open'].iloc[-1]  # Get the opening price
+        latest_volume = volume.iloc[-1]
+        latest_timestamp = df['timestamp'].iloc[-1]
 
-        lookback_df = df.iloc[-LOOKBACK_PERIOD:]
-        period_high = lookback_df['high'].max()
-        period_low = lookback_df['low'].min()
+        period_high = df['high'].iloc[-LOOKBACK_PERIOD:].max()
+        period_low = df['low'].iloc[-LOOKBACK_PERIOD:].min()
 
-        avg_volume_df = df.iloc[-(AVG_VOLUME_LOOKBACK + 1):-1]
-        avg_volume_lookback_val = avg_volume_df['volume'].mean()
+        avg_volume_lookback_val = volume.iloc[-(AVG_VOLUME_LOOKBACK + 1):-1].mean()
 
         results.update({
             'close': latest_close,
@@ -176,12 +205,7 @@ def apply_screening(df, symbol):
             logging.info(f"[{symbol}] Passed all {TOTAL_RULES} screening conditions.")
         else:
             results['failed_overall'] = True
-            failed_rules = []
-            if not results['passed_rule1']: failed_rules.append(f"Rule1(Trend)")
-            if not results['passed_rule2']: failed_rules.append(f"Rule2(Drop%)")
-            if not results['passed_rule3']: failed_rules.append(f"Rule3(VolRatio)")
-            if not results['passed_rule4']: failed_rules.append(f"Rule4(PriceRange)")
-            if not results['passed_rule5']: failed_rules.append(f"Rule5(BuyVolume)")
+            failed_rules = [name for rule_key, name in RULE_SHORT_NAMES.items() if not results[rule_key]]
             results['reason'] = f"Failed: {', '.join(failed_rules)}"
             logging.info(f"[{symbol}] Did not pass all screening conditions. Passed {results['rules_passed_count']}/{TOTAL_RULES} rules.")
 
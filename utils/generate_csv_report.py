@@ -3,7 +3,6 @@ import os
 import pandas as pd
 import time
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add project root to Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -13,7 +12,7 @@ if project_root not in sys.path:
 # Import project modules
 import config
 from utils.helpers import logging, load_stock_list
-from data_fetcher import fetch_historical_data, get_access_token
+from data_fetcher import fetch_historical_data_batch, get_access_token
 from screener_logic import EMA_PERIOD_SHORT, EMA_PERIOD_LONG, AVG_VOLUME_LOOKBACK, LOOKBACK_PERIOD
 
 # Constants for price filtering
@@ -89,22 +88,18 @@ def calculate_metrics(df, symbol, isin):
         logging.error(traceback.format_exc())
         return None
 
-def process_stock(stock, to_date_str, from_date_str):
-    """Process a single stock to fetch data and calculate metrics."""
+def get_instrument_key(stock):
+    """Builds the Upstox instrument key for a stock from the stock list."""
+    return f"{EXCHANGE}_{INSTRUMENT_TYPE}|{stock['isin']}"
+
+def process_stock(stock, historical_df):
+    """Calculate metrics for a single stock from its already-fetched candles."""
     symbol = stock['symbol']
     isin = stock['isin']
-    instrument_key = f"{EXCHANGE}_{INSTRUMENT_TYPE}|{isin}"
     
-    logging.info(f"Processing: {symbol} ({instrument_key})")
+    logging.info(f"Processing: {symbol} ({get_instrument_key(stock)})")
     
     try:
-        historical_df = fetch_historical_data(
-            instrument_key=instrument_key,
-            interval=FETCH_INTERVAL,
-            to_date=to_date_str,
-            from_date=from_date_str
-        )
-        
         if historical_df is None:
             logging.warning(f"[{symbol}] No data fetched. Skipping.")
             return None
@@ -151,14 +146,21 @@ def generate_csv_report():
     all_metrics = []
     fetch_errors = 0
     
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        futures = {executor.submit(process_stock, stock, to_date_str, from_date_str): stock for stock in stocks_to_scan}
-        for future in as_completed(futures):
-            metrics = future.result()
-            if metrics is not None:
-                all_metrics.append(metrics)
-            else:
-                fetch_errors += 1
+    # Fetch all candles concurrently (3 requests in flight), then compute metrics from them
+    instrument_keys = [get_instrument_key(stock) for stock in stocks_to_scan]
+    historical_data = fetch_historical_data_batch(
+        instrument_keys,
+        max_workers=3,
+        interval=FETCH_INTERVAL,
+        to_date=to_date_str,
+        from_date=from_date_str
+    )
+    for stock, instrument_key in zip(stocks_to_scan, instrument_keys):
+        metrics = process_stock(stock, historical_data.get(instrument_key))
+        if metrics is not None:
+            all_metrics.append(metrics)
+        else:
+            fetch_errors += 1
     
     # 4. Create CSV report
     if all_metrics:
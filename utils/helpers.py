@@ -53,11 +53,6 @@ def load_stock_list(filename=None):
 
     stocks = []
     try:
-        # Ensure the file exists before trying to open it
-        if not os.path.exists(filename):
-            logging.error(f"Stock list file not found: {filename}")
-            return []
-
         with open(filename, mode='r', newline='', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile)
             # Check if header exists and has the required columns
@@ -78,8 +73,8 @@ def load_stock_list(filename=None):
             logging.warning(f"No valid stock entries found in {filename}.")
 
     except FileNotFoundError:
-        # This case is already handled by os.path.exists, but kept for robustness
         logging.error(f"Stock list file not found: {filename}")
+        return []
     except Exception as e:
         logging.error(f"Error reading stock list file {filename}: {e}")
         return [] # Return empty list on error
@@ -169,6 +164,15 @@ def get_report_filename(prefix="report_", use_date_only=False, report_date=None)
     os.makedirs(report_dir, exist_ok=True)
     return os.path.join(report_dir, f"{prefix}{date_str}.html")
 
+def remove_partial_report(tmp_filename):
+    """Deletes the half-written temp file of a failed report write, if there is one."""
+    try:
+        os.remove(tmp_filename)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove partial report {tmp_filename}: {e}")
+
 
 # Example usage (for testing later)
 if __name__ == '__main__':
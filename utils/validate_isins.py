@@ -15,10 +15,10 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 import requests # Ensure requests is imported
-from datetime import datetime, timedelta, timezone # Import timezone
+from datetime import datetime, timedelta
 import time
 import json # Import json for discord payload
-import pytz # Import pytz for IST conversion
+from zoneinfo import ZoneInfo # IST conversion
 import csv # Import csv module
 from concurrent.futures import ThreadPoolExecutor, as_completed  # NEW import
 import signal  # Add signal module for better interrupt handling
@@ -27,6 +27,7 @@ import signal  # Add signal module for better interrupt handling
 import config
 from data_fetcher import get_api_headers, API_VERSION # Import necessary items
 from utils.helpers import load_stock_list, logging # Import from helpers
+from discord_notifier import post_discord_webhook, _chunk_line_ranges
 
 # --- Configuration ---
 # Assume NSE Equity for constructing the key. Modify if needed.
@@ -34,6 +35,7 @@ EXCHANGE = "NSE"
 INSTRUMENT_TYPE = "EQ"
 VALIDATION_INTERVAL = "1minute" # Use a small interval for quick check
 VALIDATION_DAYS_BACK = 2 # Check data for the last couple of days
+IST_TZ = ZoneInfo('Asia/Kolkata') # Resolved once at import
 
 # --- Helper Functions ---
 
@@ -133,22 +135,11 @@ def send_stocklist_to_discord(valid_stocks, invalid_stocks, total_checked, durat
     # Format duration
     duration_str = f"{duration_seconds:.2f} seconds"
     if duration_seconds > 60:
-        minutes = int(duration_seconds // 60)
-        seconds = int(duration_seconds % 60)
+        minutes, seconds = divmod(int(duration_seconds), 60)
         duration_str = f"{minutes}m {seconds}s"
 
-    # Get current time in IST and format conditionally
-    try:
-        ist_tz = pytz.timezone('Asia/Kolkata')
-        now_ist = datetime.now(ist_tz)
-        today_ist_date = now_ist.date()
-        if now_ist.date() == today_ist_date:
-            now_formatted_str = now_ist.strftime('Today at %I:%M %p')
-        else:
-            now_formatted_str = now_ist.strftime('%d %b %Y, %I:%M %p')
-    except Exception as e:
-        logging.error(f"Error getting/formatting IST time: {e}")
-        now_formatted_str = datetime.now(timezone.utc).strftime('%d %b %Y, %H:%M UTC')
+    # Validation just finished, so the timestamp is always today's
+    now_formatted_str = datetime.now(IST_TZ).strftime('Today at %I:%M %p')
 
     username = "Stocklist Validator"
     embeds_to_send = [] # Will hold the summary embed and potentially invalid list parts
@@ -189,45 +180,26 @@ def send_stocklist_to_discord(valid_stocks, invalid_stocks, total_checked, durat
     if invalid_stocks:
         logging.info(f"Generating embed(s) for {len(invalid_stocks)} invalid stocks list...")
         color_invalid = 0xFF0000 # Red
-        current_desc_invalid = ""
-        part_num_invalid = 1
-        lines_needed_invalid = len(invalid_stocks)
-        total_parts_invalid = (lines_needed_invalid + MAX_LINES_PER_DESC - 1) // MAX_LINES_PER_DESC
-        # Footer only needed if this is the *only* embed (i.e., no valid stocks found previously)
-        # However, the summary embed is always added first now, so invalid list never needs the main footer.
-        footer_invalid = None
-
-        for i, stock in enumerate(invalid_stocks):
-            line = f"{i+1}. {stock['symbol']} ({stock['isin']})\n"
-            if (len(current_desc_invalid) + len(line) > MAX_CHARS_PER_DESC and current_desc_invalid) or \
-               current_desc_invalid.count('\n') >= MAX_LINES_PER_DESC:
-                embed = {
-                    "title": f"Invalid Stock List ({len(invalid_stocks)} Total)" + (f" - Part {part_num_invalid}/{total_parts_invalid}" if total_parts_invalid > 1 else ""),
-                    "description": current_desc_invalid,
-                    "color": color_invalid,
-                    # No footer needed for these parts as summary embed has it
-                }
-                embeds_to_send.append(embed)
-                current_desc_invalid = line
-                part_num_invalid += 1
-            else:
-                current_desc_invalid += line
+        lines_invalid = [f"{i}. {stock['symbol']} ({stock['isin']})\n" for i, stock in enumerate(invalid_stocks, 1)]
+
+        ranges_invalid = _chunk_line_ranges(lines_invalid, MAX_LINES_PER_DESC, MAX_CHARS_PER_DESC)
 
-        # Add the last chunk for invalid stocks
-        if current_desc_invalid:
-             embed = {
-                "title": f"Invalid Stock List ({len(invalid_stocks)} Total)" + (f" - Part {part_num_invalid}/{total_parts_invalid}" if total_parts_invalid > 1 else ""),
-                "description": current_desc_invalid,
+        total_parts_invalid = len(ranges_invalid)
+        title_invalid = f"Invalid Stock List ({len(invalid_stocks)} Total)"
+        # No footer needed for these parts as the summary embed always goes first and has it
+        for part_num_invalid, (part_start, part_end) in enumerate(ranges_invalid, 1):
+            embeds_to_send.append({
+                "title": title_invalid + (f" - Part {part_num_invalid}/{total_parts_invalid}" if total_parts_invalid > 1 else ""),
+                "description": "".join(lines_invalid[part_start:part_end]),
                 "color": color_invalid,
-             }
-             # No footer needed here either
-             embeds_to_send.append(embed)
+            })
 
     # --- Send the embed message(s) ---
     if not embeds_to_send:
         logging.warning("No embeds generated to send.")
         return
 
+    # Messages go out back-to-back in order; post_discord_webhook waits only when Discord returns 429
     logging.info(f"Sending {len(embeds_to_send)} embed(s) to Discord...")
     max_embeds_per_message = 10
     num_messages = (len(embeds_to_send) + max_embeds_per_message - 1) // max_embeds_per_message
@@ -238,15 +210,13 @@ def send_stocklist_to_discord(valid_stocks, invalid_stocks, total_checked, durat
         if not embed_chunk: continue
         payload = {"username": username, "embeds": embed_chunk}
         try:
-            response = requests.post(webhook_url, json=payload, timeout=15)
-            response.raise_for_status()
+            post_discord_webhook(webhook_url, payload)
             logging.info(f"Discord embed notification sent successfully (Message {i+1}/{num_messages}).")
         except requests.exceptions.RequestException as e:
             logging.error(f"Error sending Discord embed notification (Message {i+1}/{num_messages}): {e}")
             if e.response is not None: logging.error(f"Discord Response: {e.response.text}")
         except Exception as e:
              logging.error(f"Unexpected error sending Discord embed notification (Message {i+1}/{num_messages}): {e}")
-        if num_messages > 1 and i < num_messages - 1: time.sleep(1)
 
 # --- Main Validation Logic ---
 